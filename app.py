@@ -1,13 +1,23 @@
 import os
+import io
+import asyncio
+import httpx
 import streamlit as st
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import orjson
+import hashlib
+import random
+import shelve
 import sys
 import subprocess
+import shutil
 import uuid
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import pathspec
 from pathlib import Path
-from google.genai import Client
+from google.genai import Client, types
 from dotenv import load_dotenv
 
 
@@ -23,6 +33,47 @@ if not GEMINI_API_KEY:
 
 
 TRELLO_API_URL = "https://api.trello.com/1/"
+# Built once instead of per call; the async client joins its relative paths onto TRELLO_API_URL
+_BOARDS_URL = TRELLO_API_URL + "boards"
+_MY_BOARDS_URL = TRELLO_API_URL + "members/me/boards?fields=name,closed"
+
+# Shared session so every Trello call reuses pooled keep-alive connections
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=20))
+
+# Maps (Trello API key, board name) to the board id so reruns can skip the board lookup
+BOARD_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".octoboard_cache.json")
+# Maps the same key to {path: [mtime_ns, size, blake2b]} for the files last sent to Gemini
+FILE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".octoboard_filecache.json")
+
+
+def load_cache(path=BOARD_CACHE_PATH):
+    """Loads a JSON cache, returning an empty one if it is missing or unreadable."""
+    try:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache, path=BOARD_CACHE_PATH):
+    try:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(cache))
+    except OSError as e:
+        print(f"Warning: could not write cache {path}: {e}")
+
+
+def board_cache_key(trello_api_key, board_name):
+    key_hash = hashlib.sha256(trello_api_key.encode()).hexdigest()[:16]
+    return f"{key_hash}:{board_name}"
+
+def clone_repo(github_url, repo_destination):
+    """Shallow-clones only the tip of the default branch, which is all the scan reads."""
+    os.makedirs(repo_destination, exist_ok=True)
+    subprocess.run(["git", "clone", "--depth=1", "--single-branch",
+                    github_url, repo_destination], check=True)
+
 
 def update_board_github(github_url):
     board_name = github_url.split('/')[-1]
@@ -33,36 +84,119 @@ def update_board_github(github_url):
     # unique repo id
     urid = str(uuid.uuid4())
     repo_destination = os.path.join("github_repos", urid)
-    subprocess.run(["mkdir", "-p", repo_destination])
-    subprocess.run(["git", "clone", github_url, repo_destination])
-    tree, contents = scan_codebase(repo_destination)
-    if repo_destination.startswith("github_repos"):
-        subprocess.run(["rm", "-rf", repo_destination])
+    try:
+        clone_repo(github_url, repo_destination)
+        tree, contents = scan_codebase(repo_destination)
+    finally:
+        shutil.rmtree(repo_destination, ignore_errors=True)
+
+
+
+
+# Static part of both Gemini prompts. It is sent as the system instruction, ahead of the
+# per-run file tree and contents, so the API can reuse the cached prefix between calls.
+TRELLO_SCHEMA = """{
+  "boardName": "Board Name",
+  "lists": [
+    {
+      "name": "List Name (e.g., 'main.py', 'helper.py', 'extra.py')",
+      "cards": [
+        {
+          "name": "Name for improvement or feature",
+          "description": "One-sentence summary of the proposed improvement or feature."
+        }
+      ]
+    }
+  ]
+}"""
 
+TRELLO_RULES = """Rules:
+1.  The "description" for each card should be a concise summary.
+2.  Label suggestions should be in categories like "Bugs", "Features", "Refactor", "Testing"."""
 
+CREATE_SYSTEM_INSTRUCTION = f"""You are a principle engineer with a lot of experience in software engineering and project management. Your job is to analyze the codebase and generate actionable, useful Trello cards. Infer the development roadmap using the provided codebase (excluding trello_script.py). Aim for at least 5 cards, covering features, improvements, refactors, bug fixes and tests.
+
+Based on the file tree and file contents you are given, generate a JSON object
+for a Trello board.
+
+
+The JSON must follow this exact schema:
+{TRELLO_SCHEMA}
+
+
+{TRELLO_RULES}
+"""
+
+UPDATE_SYSTEM_INSTRUCTION = f"""You are an intelligent code analysis assistant that helps developers manage their projects by analyzing codebases and generating actionable Trello cards. Your job is to
+analyze a codebase, update the development roadmap using the provided codebase (excluding this file) and automatically generate structured Trello card recommendations.
+
+Based on the file tree, file contents and existing cards you are given, generate a JSON object
+for a Trello board. If the description of a generated card roughly matches the description of an existing card in the board, rewrite the generated card as the existing matching card. Do not include any generated cards that have been resolved in the codebase. Otherwise, add new cards as needed.
+Existing cards are grouped by the name of the list they were in, which is the file they cover.
+Files under UNCHANGED FILES are listed without content because they have not changed since the existing cards were generated, so reproduce their existing cards, with the same name and description, in the list of the same name unless a changed file resolves them.
+
+
+The JSON must follow this exact schema:
+{TRELLO_SCHEMA}
+
+
+{TRELLO_RULES}
+"""
+
+
+async def _stream_gemini(client, system_instruction, prompt, status):
+    """Streams Gemini's answer to prompt, reporting progress, and returns (text, usage metadata)."""
+    chunks = []
+    received = 0
+    usage = None
+    stream = await client.aio.models.generate_content_stream(
+        model='gemini-2.5-flash',
+        contents=prompt,
+        config=types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            # JSON mode returns the bare object, so there is no code fence to strip
+            response_mime_type="application/json",
+        )
+    )
+    async for chunk in stream:
+        if chunk.text:
+            chunks.append(chunk.text)
+            received += len(chunk.text)
+            status.update(label=f"Receiving Gemini's answer ({received} characters)...")
+        if chunk.usage_metadata:
+            usage = chunk.usage_metadata
+    return "".join(chunks), usage
+
+
+def ask_gemini_for_json(client, system_instruction, prompt, status):
+    """Sends prompt to Gemini and returns the JSON object it answers with, exiting if it can't be parsed."""
+    response_text = ""
+    try:
+        response_text, usage = asyncio.run(
+            _stream_gemini(client, system_instruction, prompt, status))
+        trello_data = orjson.loads(response_text)
+    except Exception as e:
+        print(f"Error parsing Gemini response: {e}")
+        if response_text:
+            print(f"Raw response: {response_text}")
+        sys.exit(1)
+    if usage:
+        print(f"  Prompt tokens: {usage.prompt_token_count}")
+        print(
+            f"  Response tokens: {usage.candidates_token_count}")
+        print(f"  Total tokens: {usage.total_token_count}")
+    return trello_data
 
 
 def update_board(board_id, code_tree, code_contents, trello_auth, status):
     print("update branch")
-    url = f"{TRELLO_API_URL}boards/{board_id}/lists"
-    trello_lists = requests.get(url, params={**trello_auth})
+    url = f"{_BOARDS_URL}/{board_id}/lists"
+    trello_lists = SESSION.get(url, params=trello_auth)
     trello_lists.raise_for_status()
     status.write("Fetching existing Trello board data...")
 
-    lists_ids = [lst['id'] for lst in trello_lists.json()]
-    data = {}
-    for id in lists_ids:
-        url = f"{TRELLO_API_URL}lists/{id}/cards"
-        cards = requests.get(url, params={**trello_auth})
-        cards.raise_for_status()
-        for card in cards.json():
-            data[card['id']] = card['desc']
-            url = f"{TRELLO_API_URL}cards/{card['id']}"
-            response = requests.delete(url, params={**trello_auth})
-            response.raise_for_status()
-        url = f"{TRELLO_API_URL}lists/{id}/closed"
-        response = requests.put(url, params={**trello_auth, 'value': 'true'})
-        response.raise_for_status()
+    existing_lists = orjson.loads(trello_lists.content)
+    data = asyncio.run(clear_board(existing_lists, trello_auth))
 
     status.write("Asking Gemini to update the Trello board...")
     if not GEMINI_API_KEY or GEMINI_API_KEY.startswith("PASTE_"):
@@ -71,36 +205,6 @@ def update_board(board_id, code_tree, code_contents, trello_auth, status):
 
     client = Client(api_key=GEMINI_API_KEY)
     prompt = f"""
-    You are an intelligent code analysis assistant that helps developers manage their projects by analyzing codebases and generating actionable Trello cards. Your job is to
-    analyze a codebase, update the development roadmap using the provided codebase (excluding this file) and automatically generate structured Trello card recommendations.
-
-    Based on the file tree and file contents below, generate a JSON object
-    for a Trello board. If the description of a generated card roughly matches the description of an existing card in the board, rewrite the generated card as the existing matching card. Do not include any generated cards that have been resolved in the codebase. Otherwise, add new cards as needed.
-
-
-    The JSON must follow this exact schema:
-    {{
-      "boardName": "Board Name",
-      "lists": [
-        {{
-          "name": "List Name (e.g., 'main.py', 'helper.py', 'extra.py')",
-          "cards": [
-            {{
-              "name": "Name for improvement or feature",
-              "description": "One-sentence summary of the proposed improvement or feature."
-            }}
-          ]
-        }}
-      ]
-    }}
-
-
-    Rules:
-    1.  The "description" for each card should be a concise summary.
-    2.  Label suggestions should be in categories like "Bugs", "Features", "Refactor", "Testing".
-    3.  Return *ONLY* the raw JSON object and nothing else. Do not wrap it in ``````.
-
-
     --- FILE TREE ---
     {code_tree}
 
@@ -114,165 +218,392 @@ def update_board(board_id, code_tree, code_contents, trello_auth, status):
 
     """
 
-    try:
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=prompt
-        )
-
-        # Clean the response to ensure it's valid JSON
-
-        response_text = response.text if response.text else ""
-        cleaned_json = response_text.strip().replace(
-            "```json", "").replace("```", "").strip()
-        return json.loads(cleaned_json)
-    except Exception as e:
-        print(f"Error parsing Gemini response: {e}")
-        if 'response' in locals() and hasattr(response, 'text'):
-            print(f"Raw response: {response.text}")
-        sys.exit(1)
-    print(f"  Prompt tokens: {response.usage_metadata.prompt_token_count}")
-    print(
-        f"  Response tokens: {response.usage_metadata.candidates_token_count}")
-    print(f"  Total tokens: {response.usage_metadata.total_token_count}")
+    return ask_gemini_for_json(client, UPDATE_SYSTEM_INSTRUCTION, prompt, status)
 
 
 def create_board(board_name, trello_auth, status):
     status.write(f"Creating Trello board: {board_name}...")
-    url = f"{TRELLO_API_URL}boards"
-    params = {'name': board_name, 'defaultLists': 'false', **trello_auth}
-    response = requests.post(url, params=params)
+    payload = {'name': board_name, 'defaultLists': False}
+    response = SESSION.post(_BOARDS_URL, params=trello_auth, json=payload)
     response.raise_for_status()
-    status.update(label=f"✅ Board created! URL: {response.json()['shortUrl']}")
-    status.write(f"✅ Board created! URL: {response.json()['shortUrl']}")
-    return response.json()['id']
+    board = orjson.loads(response.content)
+    status.update(label=f"✅ Board created! URL: {board['shortUrl']}")
+    status.write(f"✅ Board created! URL: {board['shortUrl']}")
+    return board['id']
+
+
+# Trello allows about 100 requests per 10 seconds per token. HTTP/2 multiplexes many
+# requests over one connection, so the connection limit alone doesn't cap in-flight requests.
+TRELLO_MAX_IN_FLIGHT = 20
+TRELLO_RATE_LIMIT_WINDOW = 10
+# Rate-limited requests back off exponentially until they have waited this long in total,
+# so a retry always outlasts at least one full rate-limit window before giving up
+TRELLO_MAX_BACKOFF = 3 * TRELLO_RATE_LIMIT_WINDOW
+
+
+async def _trello_request(client, semaphore, method, url, **kwargs):
+    """Sends one Trello request, backing off while it is rate-limited, and returns the response."""
+    # Only a 429 is retried: Trello rejected the request without acting on it, so resending
+    # can't duplicate it. Transport errors and 5xx may have been applied and are not retried.
+    waited = 0
+    delay = 1
+    async with semaphore:
+        while True:
+            response = await client.request(method, url, **kwargs)
+            if response.status_code != 429 or waited >= TRELLO_MAX_BACKOFF:
+                break
+            # Jitter keeps the requests that were limited together from retrying in lockstep
+            pause = random.uniform(delay, 2 * delay)
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                pause = max(pause, int(retry_after))
+            await asyncio.sleep(pause)
+            waited += pause
+            delay *= 2
+    response.raise_for_status()
+    return response
+
 
+async def _post_trello(client, semaphore, url, payload):
+    """POSTs payload and returns the new object's id."""
+    response = await _trello_request(client, semaphore, 'POST', url, json=payload)
+    return orjson.loads(response.content)['id']
 
-def create_list(board_id, list_name, trello_auth, status):
+
+async def create_list_async(client, semaphore, board_id, list_name, pos, status):
     status.write(f"  Creating list: {list_name}...")
-    url = f"{TRELLO_API_URL}lists/"
-    params = {'name': list_name, 'idBoard': board_id, **trello_auth}
-    response = requests.post(url, params=params)
-    response.raise_for_status()
-    return response.json()['id']
+    payload = {'name': list_name, 'idBoard': board_id, 'pos': pos}
+    return await _post_trello(client, semaphore, "lists/", payload)
 
 
-def create_card(list_id, card_name, card_desc, trello_auth, status):
+async def create_card_async(client, semaphore, list_id, card_name, card_desc, pos, status):
     status.write(f"    Creating card: {card_name}...")
-    url = f"{TRELLO_API_URL}cards/"
-    params = {'name': card_name, 'desc': card_desc,
-              'idList': list_id, **trello_auth}
-    response = requests.post(url, params=params)
-    response.raise_for_status()
-    return response.json()['id']
+    payload = {'name': card_name, 'desc': card_desc,
+               'idList': list_id, 'pos': pos}
+    return await _post_trello(client, semaphore, "cards/", payload)
+
+
+def _trello_client(trello_auth):
+    # Auth rides on the client's default query params; each request only carries its own payload
+    limits = httpx.Limits(max_connections=20)
+    return httpx.AsyncClient(base_url=TRELLO_API_URL, http2=True, limits=limits,
+                             params=trello_auth)
+
+
+async def _gather_all(coros):
+    """Like asyncio.gather, but lets every request finish before raising the first failure."""
+    # Plain gather raises on the first error while the rest are still in flight, and the client
+    # then closes under them, leaving whatever happened to land as a partial board
+    results = await asyncio.gather(*coros, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+async def fetch_cards(client, semaphore, list_id):
+    response = await _trello_request(client, semaphore, 'GET', f"lists/{list_id}/cards")
+    return orjson.loads(response.content)
+
+
+async def delete_card(client, semaphore, card_id):
+    await _trello_request(client, semaphore, 'DELETE', f"cards/{card_id}")
+
+
+async def close_list(client, semaphore, list_id):
+    await _trello_request(client, semaphore, 'PUT', f"lists/{list_id}/closed",
+                          json={'value': True})
+
+
+async def clear_board(trello_lists, trello_auth):
+    """Fetches every list's cards concurrently, then deletes those cards and closes the lists.
+
+    Returns the removed cards grouped by list name, as {list name: [{"name", "description"}]},
+    so Gemini can tell which file each existing card belongs to.
+    """
+    lists_ids = [lst['id'] for lst in trello_lists]
+    semaphore = asyncio.Semaphore(TRELLO_MAX_IN_FLIGHT)
+    async with _trello_client(trello_auth) as client:
+        all_cards = await _gather_all([
+            fetch_cards(client, semaphore, list_id) for list_id in lists_ids
+        ])
+        data = {}
+        for trello_list, cards in zip(trello_lists, all_cards):
+            data.setdefault(trello_list['name'], []).extend(
+                {'name': card['name'], 'description': card['desc']} for card in cards)
+
+        await _gather_all([
+            *[delete_card(client, semaphore, card['id'])
+              for cards in all_cards for card in cards],
+            *[close_list(client, semaphore, list_id) for list_id in lists_ids],
+        ])
+    return data
+
+
+async def build_board(board_id, trello_data, trello_auth, status):
+    """Creates all lists in one wave, then all cards in a second. Explicit positions keep Gemini's ordering."""
+    trello_lists = trello_data.get('lists', [])
+    semaphore = asyncio.Semaphore(TRELLO_MAX_IN_FLIGHT)
+    async with _trello_client(trello_auth) as client:
+        list_ids = await _gather_all([
+            create_list_async(client, semaphore, board_id,
+                              trello_list.get('name', 'Unnamed List'),
+                              pos, status)
+            for pos, trello_list in enumerate(trello_lists, start=1)
+        ])
+
+        batch = [
+            (list_id, card.get('name', 'Unnamed Card'),
+             card.get('description', 'No description.'), pos)
+            for list_id, trello_list in zip(list_ids, trello_lists)
+            for pos, card in enumerate(trello_list.get('cards', []), start=1)
+        ]
+        await _gather_all([
+            create_card_async(client, semaphore, *item, status)
+            for item in batch
+        ])
 
 import os
 import pathspec
 from pathlib import Path
 
-def scan_codebase(root_dir=".", max_file_size=10000):
-    """Scans the codebase and returns a string with the file tree and key file contents."""
-    file_tree = []
-    file_contents = []
-
-    # Load .obignore patterns
-    obignore_path = Path(root_dir) / ".obignore"
-    default_patterns = [
-        'node_modules/',
-        '.git/',
-        '.vscode/',
-        '__pycache__/',
-        'venv/',
-        '.venv/',
-        '.github/',
-        '.env',
-        '*.pyc',
-        'dist/',
-        'build/',
-        '*.min.js',
-        'package-lock.json',
-        'yarn.lock',
-    ]
-
-    patterns = default_patterns.copy()
-
-    if obignore_path.exists():
-        with open(obignore_path, 'r') as f:
-            # Filter out empty lines and comments
-            user_patterns = [
-                line.strip()
-                for line in f.read().splitlines()
-                if line.strip() and not line.strip().startswith('#')
-            ]
-            patterns.extend(user_patterns)
+# Names that are always skipped, checked by a set lookup before falling back to pathspec
+IGNORE_DIRS = frozenset({
+    'node_modules', '.git', '.vscode', '__pycache__', 'venv', '.venv',
+    '.github', 'dist', 'build',
+})
+IGNORE_FILES = frozenset({'.env', 'package-lock.json', 'yarn.lock'})
+
+# Only files with these extensions, or these exact names, are read; anything else (images,
+# archives, binaries) still shows up in the file tree but its bytes are never touched
+CODE_EXTS = frozenset({
+    '.py', '.js', '.mjs', '.cjs', '.ts', '.tsx', '.jsx', '.vue', '.svelte',
+    '.java', '.kt', '.kts', '.scala', '.groovy', '.gradle', '.rs', '.go',
+    '.c', '.h', '.cpp', '.hpp', '.cc', '.cs', '.m', '.swift', '.dart',
+    '.rb', '.php', '.pl', '.lua', '.r', '.ex', '.exs', '.erl', '.hs', '.clj',
+    '.sh', '.bash', '.ps1', '.bat', '.sql', '.proto', '.graphql', '.tf',
+    '.md', '.rst', '.txt', '.toml', '.yaml', '.yml', '.json', '.xml',
+    '.cfg', '.ini', '.conf', '.properties', '.cmake', '.mk',
+    '.html', '.css', '.scss', '.sass', '.less',
+})
+CODE_NAMES = frozenset({
+    'Dockerfile', 'Makefile', 'GNUmakefile', 'Procfile', 'Gemfile', 'Rakefile',
+    'Jenkinsfile', 'Vagrantfile', '.gitignore', '.obignore', '.dockerignore',
+    '.editorconfig', '.gitattributes',
+})
+
+DEFAULT_IGNORE_PATTERNS = (
+    'node_modules/',
+    '.git/',
+    '.vscode/',
+    '__pycache__/',
+    'venv/',
+    '.venv/',
+    '.github/',
+    '.env',
+    '*.pyc',
+    'dist/',
+    'build/',
+    '*.min.js',
+    'package-lock.json',
+    'yarn.lock',
+)
+
+
+@lru_cache(maxsize=32)
+def _compile_spec(patterns):
+    """Compiles (and memoizes) a PathSpec for a tuple of gitwildmatch patterns."""
+    return pathspec.PathSpec.from_lines('gitwildmatch', patterns)
+
+
+def _read_ignore_patterns(ignore_path):
+    """Returns the gitwildmatch patterns in an ignore file, or an empty list if it doesn't exist."""
+    if not ignore_path.exists():
+        return []
+    with open(ignore_path, 'r') as f:
+        # Filter out empty lines and comments
+        return [
+            line.strip()
+            for line in f.read().splitlines()
+            if line.strip() and not line.strip().startswith('#')
+        ]
+
+
+def scan_codebase(root_dir=".", max_file_size=10000, file_hashes=None):
+    """Scans the codebase and returns a string with the file tree and key file contents.
+
+    If file_hashes is given, it should hold the {path: [mtime_ns, size, digest]} map from
+    the previous run. Files whose content hash is unchanged are only listed, not sent in
+    full, and file_hashes is updated in place to describe the current files.
+    """
+    # Written straight into buffers rather than collected in lists and joined at the end
+    file_tree = io.StringIO()
+    file_contents = io.StringIO()
+    unchanged_files = io.StringIO()
+    previous_hashes = dict(file_hashes) if file_hashes is not None else None
+    if file_hashes is not None:
+        file_hashes.clear()
+
+    # Load .gitignore and .obignore patterns so ignored trees are pruned before descending
+    patterns = list(DEFAULT_IGNORE_PATTERNS)
+    patterns.extend(_read_ignore_patterns(Path(root_dir) / ".gitignore"))
+    patterns.extend(_read_ignore_patterns(Path(root_dir) / ".obignore"))
 
     # Create PathSpec object
-    spec = pathspec.PathSpec.from_lines('gitwildmatch', patterns)
+    spec = _compile_spec(tuple(patterns))
+
+    files = []
+    _scan(root_dir, "", spec, file_tree, files, 0)
+
+    # Reads overlap on slow or networked storage; map() still yields results in walk order
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = executor.map(
+            lambda f: _read_file(*f, max_file_size, previous_hashes), files)
+        for relative_file_path, hash_entry, block in results:
+            if hash_entry is not None:
+                file_hashes[relative_file_path] = hash_entry
+            if block is None:
+                unchanged_files.write(f"{relative_file_path} ({hash_entry[2]})\n")
+            else:
+                file_contents.write(block)
 
-    for root, dirs, files in os.walk(root_dir):
-        # Calculate relative path for the current directory
-        if root == root_dir:
-            rel_root = ""
-        else:
-            rel_root = os.path.relpath(root, root_dir)
+    if not unchanged_files.tell():
+        return file_tree.getvalue(), file_contents.getvalue()
 
-        # Filter out ignored directories
-        filtered_dirs = []
-        for d in dirs:
-            if rel_root:
-                dir_rel_path = os.path.join(rel_root, d) + '/'
-            else:
-                dir_rel_path = d + '/'
+    contents = (
+        f"--- UNCHANGED FILES (listing only) ---\n{unchanged_files.getvalue()}\n"
+        f"--- CHANGED FILES (full content) ---\n{file_contents.getvalue()}"
+    )
+    return file_tree.getvalue(), contents
 
-            if not spec.match_file(dir_rel_path):
-                filtered_dirs.append(d)
 
-        dirs[:] = filtered_dirs
+def _scan(path, rel_path, spec, file_tree, files, level):
+    """Recursively writes the tree lines under path and collects (relative path, DirEntry) for each file."""
+    try:
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        # Unreadable or vanished directories are skipped, as os.walk does
+        return
+
+    indent = "  " * level
+    subdirs = []
+    for entry in entries:
+        relative_file_path = rel_path + entry.name
+
+        if entry.is_dir(follow_symlinks=False):
+            # Filter out ignored directories
+            if entry.name not in IGNORE_DIRS and not spec.match_file(relative_file_path + '/'):
+                subdirs.append(entry)
+            continue
+        if entry.is_symlink() and entry.is_dir():
+            continue
+
+        # Skip if file matches obignore patterns
+        if entry.name in IGNORE_FILES or spec.match_file(relative_file_path):
+            print("Ignoring: ", relative_file_path)
+            continue
+
+        file_tree.write(f"{indent}  📄 {entry.name}\n")
+        _, ext = os.path.splitext(entry.name)
+        if ext.lower() in CODE_EXTS or entry.name in CODE_NAMES:
+            files.append((relative_file_path, entry))
+
+    for entry in subdirs:
+        file_tree.write(f"{indent}  📁 {entry.name}/\n")
+        _scan(entry.path, rel_path + entry.name + os.sep, spec, file_tree, files, level + 1)
+
+
+def _read_file(relative_file_path, entry, max_file_size, previous_hashes):
+    """Returns (relative path, hash entry, content block) for one file; a None block means unchanged."""
+    truncated = f"--- Content of {relative_file_path} (truncated) ---\nFile is too large, skipping content.\n\n"
+    try:
+        stat = entry.stat()
+        if stat.st_size > max_file_size:
+            return relative_file_path, None, truncated
 
-        rel_path = os.path.relpath(root, root_dir)
-        if rel_path == ".":
-            level = 0
-        else:
-            level = rel_path.count(os.sep) + 1
+        previous = previous_hashes.get(relative_file_path) if previous_hashes else None
+        if previous and previous[:2] == [stat.st_mtime_ns, stat.st_size]:
+            # Same mtime and size as last run, so trust the stored hash without reading
+            return relative_file_path, previous, None
 
-        indent = "  " * level
+        # Read at most one byte past the cap so files that grew since stat() are still caught
+        fd = os.open(entry.path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            raw = os.read(fd, max_file_size + 1)
+        finally:
+            os.close(fd)
+
+        if len(raw) > max_file_size:
+            return relative_file_path, None, truncated
+
+        hash_entry = None
+        if previous_hashes is not None:
+            digest = hashlib.blake2b(raw, digest_size=8).hexdigest()
+            hash_entry = [stat.st_mtime_ns, stat.st_size, digest]
+            if previous and previous[2] == digest:
+                return relative_file_path, hash_entry, None
+
+        content = raw.decode('utf-8', 'replace')
+        return relative_file_path, hash_entry, f"--- Content of {relative_file_path} ---\n{content}\n\n"
+    except Exception as e:
+        return relative_file_path, None, f"--- Could not read {relative_file_path}: {e} ---\n\n"
 
-        if level > 0:
-            file_tree.append(f"{indent}📁 {os.path.basename(root)}/")
 
-        for f in files:
-            # Calculate relative file path
-            if rel_root:
-                relative_file_path = os.path.join(rel_root, f)
-            else:
-                relative_file_path = f
+# Latest parsed Gemini board per board cache key, stored with a digest of the prompt inputs it
+# answered. Bump PROMPT_VERSION whenever the prompt text changes so stale answers are not reused.
+PROMPT_VERSION = "3"
+LLM_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".octoboard_llm_cache")
 
-            # Skip if file matches obignore patterns
-            if spec.match_file(relative_file_path):
-                print("Ignoring: ", relative_file_path)
-                continue
 
-            file_tree.append(f"{indent}  📄 {f}")
+def _cache_key(code_tree, code_contents):
+    digest = hashlib.blake2b(PROMPT_VERSION.encode(), digest_size=16)
+    digest.update(code_tree.encode())
+    digest.update(b"\0")
+    digest.update(code_contents.encode())
+    return digest.hexdigest()
 
-            try:
-                full_path = os.path.join(root, f)
-                if os.path.getsize(full_path) > max_file_size:
-                    file_contents.append(
-                        f"--- Content of {relative_file_path} (truncated) ---\nFile is too large, skipping content.\n")
-                    continue
-
-                with open(full_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                    file_contents.append(
-                        f"--- Content of {relative_file_path} ---\n{content}\n")
-            except Exception as e:
-                file_contents.append(
-                    f"--- Could not read {relative_file_path}: {e} ---\n")
 
-    return "\n".join(file_tree), "\n".join(file_contents)
+def compute_repo_digest(code_tree, file_hashes):
+    """Digest of everything a board is built from: the prompt version, the file tree and each file's hash."""
+    digest = hashlib.blake2b(PROMPT_VERSION.encode(), digest_size=16)
+    digest.update(code_tree.encode())
+    for path in sorted(file_hashes):
+        digest.update(f"\0{path}\0{file_hashes[path][2]}".encode())
+    return digest.hexdigest()
+
+
+def _load_llm_cache(board_key, digest):
+    # An unreadable cache only costs a fresh Gemini call, so treat any error as a miss
+    try:
+        with shelve.open(LLM_CACHE_PATH) as db:
+            entry = db.get(board_key)
+    except Exception as e:
+        print(f"Warning: could not read the Gemini cache: {e}")
+        return None
+    if isinstance(entry, dict) and entry.get('digest') == digest:
+        return entry['trello_data']
+    return None
+
+
+def _save_llm_cache(board_key, digest, trello_data):
+    try:
+        with shelve.open(LLM_CACHE_PATH) as db:
+            # Older releases keyed entries by digest alone; drop them so the file stops growing
+            for key in [key for key in db.keys() if ':' not in key]:
+                del db[key]
+            db[board_key] = {'digest': digest, 'trello_data': trello_data}
+    except Exception as e:
+        print(f"Warning: could not write the Gemini cache: {e}")
+
 
+def get_trello_json_from_gemini(code_tree, code_contents, status, board_key):
+    digest = _cache_key(code_tree, code_contents)
+    trello_data = _load_llm_cache(board_key, digest)
+    if trello_data is not None:
+        status.write("Codebase unchanged since the last Gemini call, reusing its board design...")
+        return trello_data
 
-def get_trello_json_from_gemini(code_tree, code_contents, status):
     status.write("Asking Gemini to design the Trello board...")
 
     if not GEMINI_API_KEY or GEMINI_API_KEY.startswith("PASTE_"):
@@ -283,35 +614,6 @@ def get_trello_json_from_gemini(code_tree, code_contents, status):
     client = Client(api_key=GEMINI_API_KEY)
 
     prompt = f"""
-    You are a principle engineer with a lot of experience in software engineering and project management. Your job is to analyze the codebase and generate actionable, useful Trello cards. Infer the development roadmap using the provided codebase (excluding trello_script.py). Aim for at least 5 cards, covering features, improvements, refactors, bug fixes and tests.
-
-    Based on the file tree and file contents below, generate a JSON object
-    for a Trello board.
-
-
-    The JSON must follow this exact schema:
-    {{
-      "boardName": "Board Name",
-      "lists": [
-        {{
-          "name": "List Name (e.g., 'main.py', 'helper.py', 'extra.py')",
-          "cards": [
-            {{
-              "name": "Name for improvement or feature",
-              "description": "One-sentence summary of the proposed improvement or feature."
-            }}
-          ]
-        }}
-      ]
-    }}
-
-
-    Rules:
-    1.  The "description" for each card should be a concise summary.
-    2.  Label suggestions should be in categories like "Bugs", "Features", "Refactor", "Testing".
-    3.  Return *ONLY* the raw JSON object and nothing else. Do not wrap it in ``````.
-
-
     --- FILE TREE ---
     {code_tree}
 
@@ -320,26 +622,30 @@ def get_trello_json_from_gemini(code_tree, code_contents, status):
     {code_contents}
     """
 
-    try:
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=prompt
-        )
+    trello_data = ask_gemini_for_json(client, CREATE_SYSTEM_INSTRUCTION, prompt, status)
+
+    _save_llm_cache(board_key, digest, trello_data)
+    return trello_data
 
-        # Clean the response to ensure it's valid JSON
-        response_text = response.text if response.text else ""
-        cleaned_json = response_text.strip().replace(
-            "```json", "").replace("```", "").strip()
-        return json.loads(cleaned_json)
-    except Exception as e:
-        print(f"Error parsing Gemini response: {e}")
-        if 'response' in locals() and hasattr(response, 'text'):
-            print(f"Raw response: {response.text}")
-        sys.exit(1)
-    print(f"  Prompt tokens: {response.usage_metadata.prompt_token_count}")
-    print(
-        f"  Response tokens: {response.usage_metadata.candidates_token_count}")
-    print(f"  Total tokens: {response.usage_metadata.total_token_count}")
+
+def find_board_id(board_name, cached_board_id, trello_auth):
+    """Returns the id of the open board named board_name, or None if there isn't one."""
+    if cached_board_id:
+        url = f"{_BOARDS_URL}/{cached_board_id}?fields=name,closed"
+        response = SESSION.get(url, params=trello_auth)
+        if response.ok:
+            board = orjson.loads(response.content)
+            if board['name'] == board_name and not board['closed']:
+                return cached_board_id
+
+    # "me" resolves to the token's member, so no separate members/me round trip is needed
+    boards = SESSION.get(_MY_BOARDS_URL, params=trello_auth)
+    boards.raise_for_status()
+    for board in orjson.loads(boards.content):
+        if board['name'] == board_name and not board['closed']:
+            print(board['name'], board_name, board['id'])
+            return board['id']
+    return None
 
 
 # --- 4. Main Execution ---
@@ -364,71 +670,74 @@ def main(trello_api_key, trello_token, status, github_url=None):
     print("--- Starting Hackathon Code-to-Trello Script ---")
     status.update(expanded=True)
 
+    cache = load_cache()
+    cache_key = board_cache_key(trello_api_key, board_name)
+    cached_board = cache.get(cache_key, {})
+    board_id = find_board_id(board_name, cached_board.get('id'), trello_auth)
+    file_cache = load_cache(FILE_CACHE_PATH)
+
     if github_url:
-        status.write("Cloning the repository")
         # unique repo id
         urid = str(uuid.uuid4())
         repo_destination = os.path.join("github_repos", urid)
-        subprocess.run(["mkdir", "-p", repo_destination])
-        subprocess.run(["git", "clone", github_url, repo_destination])
     else:
         repo_destination = "."
 
-    # Step 1: Scan the codebase
-    status.write("Scanning the codebase...")
-    tree, contents = scan_codebase(repo_destination)
-    if "github_repos" in repo_destination:
-        subprocess.run(["rm", "-rf", repo_destination])
-
-    url = f"{TRELLO_API_URL}members/me/"
-    user_id = requests.get(url, params={**trello_auth})
-    user_id.raise_for_status()
-    user_id = user_id.json()['id']
-    url = f"{TRELLO_API_URL}members/{user_id}/boards"
-    boards = requests.get(url, params={**trello_auth})
-    boards.raise_for_status()
-    board_exists = False
-    for board in boards.json():
-        if board['name'] == board_name and not board['closed']:
-            print(board['name'], board_name, board['id'])
-            cached_board_id = board['id']
-            board_exists = True
-            break
-
-    if board_exists:
-        board_id = cached_board_id
-        try:
-            url = f"{TRELLO_API_URL}boards/{board_id}"
-            response = requests.get(url, params={**trello_auth})
-            response.raise_for_status()
-            if board_exists:
-                trello_data = update_board(board_id, tree, contents, trello_auth, status)
-
-                for trello_list in trello_data.get('lists', []):
-                    list_name = trello_list.get('name', 'Unnamed List')
-                    list_id = create_list(board_id, list_name, trello_auth, status)
-                    for card in trello_list.get('cards', []):
-                        card_name = card.get('name', 'Unnamed Card')
-                        card_desc = card.get('description', 'No description.')
-                        create_card(list_id, card_name, card_desc,
-                                    trello_auth, status)
-            status.update(label="Trello has been updated")
-        except:
-            status.write(f"Error updating existing board with board id: {board_id}, creating a new one instead.")
-
-    if not board_exists:
-        trello_data = get_trello_json_from_gemini(tree, contents, status)
-        status.write("\n--- Building Trello Board ---")
-        board_id = create_board(board_name, trello_auth, status)
-
-        for trello_list in trello_data.get('lists', []):
-            list_name = trello_list.get('name', 'Unnamed List')
-            list_id = create_list(board_id, list_name, trello_auth, status)
-
-            for card in trello_list.get('cards', []):
-                card_name = card.get('name', 'Unnamed Card')
-                card_desc = card.get('description', 'No description.')
-                create_card(list_id, card_name, card_desc, trello_auth, status)
+    try:
+        if github_url:
+            status.write("Cloning the repository")
+            try:
+                clone_repo(github_url, repo_destination)
+            except subprocess.CalledProcessError as e:
+                status.write(f"Error cloning {github_url}: git exited with status {e.returncode}")
+                status.update(label="Cloning the repository failed", state="error")
+                return
+
+        if board_id:
+            # A digest recorded against a different board id says nothing about this board
+            last_digest = cached_board.get('repo_digest') if cached_board.get('id') == board_id else None
+            cache[cache_key] = {'id': board_id}
+            save_cache(cache)
+            try:
+                # Only files that changed since the board was last built are sent in full. The
+                # stored hashes are only trusted when last_digest is set, i.e. the last run on this
+                # same board id finished; after a failed update the board may have been emptied.
+                file_hashes = dict(file_cache.get(cache_key, {})) if last_digest else {}
+                status.write("Scanning the codebase...")
+                tree, contents = scan_codebase(repo_destination, file_hashes=file_hashes)
+                repo_digest = compute_repo_digest(tree, file_hashes)
+                if repo_digest == last_digest:
+                    status.update(label="No changes since last run")
+                else:
+                    trello_data = update_board(board_id, tree, contents, trello_auth, status)
+                    asyncio.run(build_board(board_id, trello_data, trello_auth, status))
+                    status.update(label="Trello has been updated")
+            except Exception as e:
+                # The update may already have cleared the board, so never build a second one
+                # beside it; report the failure and leave the caches describing the last good run
+                status.write(f"Error updating existing board with board id: {board_id}: {e}")
+                status.update(label="Updating the Trello board failed", state="error")
+                return
+        else:
+            file_hashes = {}
+            status.write("Scanning the codebase...")
+            tree, contents = scan_codebase(repo_destination, file_hashes=file_hashes)
+            repo_digest = compute_repo_digest(tree, file_hashes)
+            trello_data = get_trello_json_from_gemini(tree, contents, status, cache_key)
+            status.write("\n--- Building Trello Board ---")
+            board_id = create_board(board_name, trello_auth, status)
+            cache[cache_key] = {'id': board_id}
+            save_cache(cache)
+            asyncio.run(build_board(board_id, trello_data, trello_auth, status))
+    finally:
+        if github_url:
+            shutil.rmtree(repo_destination, ignore_errors=True)
+
+    # Only recorded once the board reflects this exact codebase
+    cache[cache_key] = {'id': board_id, 'repo_digest': repo_digest}
+    save_cache(cache)
+    file_cache[cache_key] = file_hashes
+    save_cache(file_cache, FILE_CACHE_PATH)
 
     status.update(state="complete", expanded=False)
     print("\n--- DEMO COMPLETE! ---")